@@ -1,17 +1,22 @@
-from fastapi import FastAPI, BackgroundTasks
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from pydantic import BaseModel
 import httpx
+import orjson
 import os
 import asyncio
-import subprocess
-import sys
+import ssl
 import time
 from pathlib import Path
+from typing import Final
 import logging
 from dotenv import load_dotenv
 
+from src.bot import main as bot
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -19,7 +24,48 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+DAILY_API_URL = os.getenv("DAILY_API_URL", "https://api.daily.co/v1")
+
+# Building an SSL context parses the whole CA bundle, so do it once
+_SSL_CTX = ssl.create_default_context()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared Daily API client on startup and close it on shutdown"""
+    # Bots run in this process, so refuse to start without their keys rather
+    # than create rooms whose bot then fails in build_services()
+    bot.require_env(*bot.REQUIRED_ENV)
+    # One pooled client keeps connections to Daily alive across requests
+    # instead of paying a TCP + TLS handshake per endpoint call, and HTTP/2
+    # lets concurrent calls share a single connection
+    app.state.daily_client = httpx.AsyncClient(
+        base_url=DAILY_API_URL,
+        http2=True,
+        verify=_SSL_CTX,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=10.0,
+    )
+    # Load the bots' dependencies once up front
+    await asyncio.to_thread(bot.preload)
+    # Every room's bot runs the same flow, so it is built once and shared
+    from src.bot.flow_config import create_flow_config
+
+    app.state.bot_flow_config = create_flow_config(DEFAULT_AI_NAME, bot.SYSTEM_PROMPT)
+    try:
+        yield
+    finally:
+        # Each bot may take up to BOT_STOP_TIMEOUT to stop, so stop them all
+        # at once rather than one after another
+        await asyncio.gather(
+            *(cleanup_background_process(u) for u in list(background_processes))
+        )
+        await bot.close_http_session()
+        await app.state.daily_client.aclose()
+
+
+# orjson encodes the endpoints' dict responses faster than the stdlib encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Add CORS middleware to allow all origins
 app.add_middleware(
@@ -30,12 +76,17 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-# Global dictionary to track background processes
-background_processes = {}
+# Global dictionary to track the bot task running in each room
+background_processes: dict[str, asyncio.Task] = {}
 
-# Default voice - Hope (popular ElevenLabs voice)
-DEFAULT_VOICE_ID = "EST9Ui6982FZPSi7gCHi"
-DEFAULT_AI_NAME = "Pizza ordering AI"
+# Rooms expire 300 seconds after creation; a bot still running shortly
+# after that has lost its participant-left event and is stopped
+BOT_MAX_LIFETIME: Final = 330
+# A cancelled bot deletes its room (up to every delete attempt timing out)
+# and then stops its pipeline and leaves the Daily call
+BOT_STOP_TIMEOUT: Final = bot.DELETE_ROOM_ATTEMPTS * bot.DELETE_ROOM_TIMEOUT + 5.0
+
+DEFAULT_AI_NAME: Final = "Pizza ordering AI"
 
 
 class CreateRoomRequest(BaseModel):
@@ -46,44 +97,79 @@ class JoinRoomRequest(BaseModel):
     room_name: str
 
 
-async def start_main_py_background(room_url: str):
-    """Background task to start main.py with the room URL"""
-    try:
-        # Get the directory where main.py is located
-        main_py_path = Path(__file__).parent.parent / "bot" / "main.py"
+class CreateRoomResponse(BaseModel):
+    url: str
+    name: str
+    expires_in_seconds: int
+    expires_at: int
+    voice_id: str
+    ai_name: str
+    background_task_started: bool
+    message: str
 
-        logger.info(f"Starting main.py background process with room URL: {room_url}")
 
-        # Start main.py as a subprocess with the room URL
-        # Remove stdout and stderr pipes to see logs in real-time
-        process = subprocess.Popen([sys.executable, str(main_py_path), "-u", room_url])
+def _on_bot_done(room_url: str, task: asyncio.Task):
+    """Forget a finished bot task and log how it ended"""
+    if background_processes.get(room_url) is task:
+        del background_processes[room_url]
+    if task.cancelled():
+        logger.info(f"Bot for room {room_url} was cancelled")
+    elif task.exception() is not None:
+        logger.error(f"Bot for room {room_url} failed: {task.exception()!r}")
+    else:
+        logger.info(f"Bot for room {room_url} finished")
 
-        logger.info(f"Started main.py background process with PID: {process.pid}")
 
-        # Store the process reference for later management
-        background_processes[room_url] = process
+async def _run_bot_until_expiry(room_url: str, flow_config):
+    """Run the bot for a room, stopping it once the room can no longer be in use"""
+    try:
+        async with asyncio.timeout(BOT_MAX_LIFETIME):
+            await bot.run_bot(room_url, flow_config, bot_name=DEFAULT_AI_NAME)
+    except TimeoutError:
+        logger.warning(f"Bot for room {room_url} outlived the room and was stopped")
+
+
+def start_bot_background(room_url: str):
+    """Start the bot for a room as a task on the server's event loop"""
+    try:
+        logger.info(f"Starting bot task with room URL: {room_url}")
+        # A room deleted within the last minute may have been recreated under
+        # the same name; this bot must still delete it when it finishes
+        bot.forget_room_deleted(room_url.rpartition("/")[2])
+
+        # The bot runs on the server's own event loop, sharing the imported
+        # libraries and loaded models instead of starting a new interpreter
+        task = asyncio.create_task(
+            _run_bot_until_expiry(room_url, app.state.bot_flow_config),
+            name=f"bot:{room_url}",
+        )
+        task.add_done_callback(lambda t: _on_bot_done(room_url, t))
+
+        # Store the task reference for later management
+        background_processes[room_url] = task
 
     except Exception as e:
-        logger.error(f"Error starting main.py: {e}")
+        logger.error(f"Error starting bot: {e}")
 
 
 async def cleanup_background_process(room_url: str):
-    """Clean up background process for a given room URL"""
-    if room_url in background_processes:
-        process = background_processes[room_url]
-        try:
-            logger.info(f"Terminating background process with PID: {process.pid}")
-            process.terminate()
-            process.wait(timeout=5)  # Wait up to 5 seconds for graceful termination
-        except subprocess.TimeoutExpired:
-            logger.warning(
-                f"Process {process.pid} did not terminate gracefully, killing it"
-            )
-            process.kill()
-        except Exception as e:
-            logger.error(f"Error terminating process {process.pid}: {e}")
-        finally:
-            del background_processes[room_url]
+    """Stop the bot task for a given room URL"""
+    task = background_processes.pop(room_url, None)
+    if task is None:
+        return
+    try:
+        logger.info(f"Cancelling bot task for room: {room_url}")
+        task.cancel()
+        # Give the bot its whole cleanup budget; timing out cancels it again
+        await asyncio.wait_for(task, timeout=BOT_STOP_TIMEOUT)
+    except asyncio.CancelledError:
+        pass
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"Bot for room {room_url} did not stop within {BOT_STOP_TIMEOUT} seconds"
+        )
+    except Exception as e:
+        logger.error(f"Error stopping bot for room {room_url}: {e}")
 
 
 @app.get("/")
@@ -100,16 +186,13 @@ async def api_root():
     return {"message": "API is running"}
 
 
-@app.post("/create-room")
-async def create_meeting_room(
-    request: CreateRoomRequest, background_tasks: BackgroundTasks
-):
+@app.post("/create-room", response_model=CreateRoomResponse)
+async def create_meeting_room(request: CreateRoomRequest):
     """Legacy endpoint - creates a room with random name"""
     token = os.getenv("DAILY_API_KEY")
     if not token:
-        return {"error": "DAILY_API_KEY environment variable not set"}
+        return ORJSONResponse({"error": "DAILY_API_KEY environment variable not set"})
 
-    url = "https://api.daily.co/v1/rooms"
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
     # Set room to expire in 5 minutes (300 seconds)
@@ -127,32 +210,36 @@ async def create_meeting_room(
         }
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, json=room_config)
-        result = response.json()
-
-        # If room creation was successful, start the background task
-        if response.status_code == 200 and "url" in result:
-            room_url = result["url"]
-            background_tasks.add_task(start_main_py_background, room_url)
-            result["background_task_started"] = True
-            result["message"] = "Room created and main.py background task started"
-            result["expires_in_seconds"] = 300
-            result["expires_at"] = expiry_time
-            result["voice_id"] = DEFAULT_VOICE_ID
-            result["ai_name"] = DEFAULT_AI_NAME
+    client: httpx.AsyncClient = app.state.daily_client
+    response = await client.post("/rooms", headers=headers, json=room_config)
+    result = orjson.loads(response.content)
+
+    # If room creation was successful, start the background task
+    if response.status_code == 200 and "url" in result:
+        room_url = result["url"]
+        start_bot_background(room_url)
+        return CreateRoomResponse(
+            url=room_url,
+            name=result["name"],
+            expires_in_seconds=300,
+            expires_at=expiry_time,
+            voice_id=bot.resolve_voice_id(),
+            ai_name=DEFAULT_AI_NAME,
+            background_task_started=True,
+            message="Room created and bot task started",
+        )
 
-        return result
+    # Errors are passed through as Daily returned them, outside the model
+    return ORJSONResponse(result)
 
 
 @app.post("/join-room")
-async def join_room(request: JoinRoomRequest, background_tasks: BackgroundTasks):
+async def join_room(request: JoinRoomRequest):
     """Create or get a room with the specified name and start the bot"""
     token = os.getenv("DAILY_API_KEY")
     if not token:
         return {"error": "DAILY_API_KEY environment variable not set"}
 
-    url = "https://api.daily.co/v1/rooms"
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
     # Set room to expire in 5 minutes (300 seconds)
@@ -171,39 +258,38 @@ async def join_room(request: JoinRoomRequest, background_tasks: BackgroundTasks)
         },
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, json=room_config)
-        result = response.json()
-
-        # If room already exists, that's fine, get the room info
-        if response.status_code == 400 and "already exists" in str(result):
-            # Get the existing room
-            get_url = f"https://api.daily.co/v1/rooms/{request.room_name}"
-            get_response = await client.get(get_url, headers=headers)
-            if get_response.status_code == 200:
-                result = get_response.json()
-                room_url = result["url"]
-                background_tasks.add_task(start_main_py_background, room_url)
-                result["background_task_started"] = True
-                result["message"] = "Joined existing room and started bot"
-                result["voice_id"] = DEFAULT_VOICE_ID
-                result["ai_name"] = DEFAULT_AI_NAME
-                result["room_name"] = request.room_name
-                return result
-
-        # If room creation was successful, start the background task
-        if response.status_code == 200 and "url" in result:
+    client: httpx.AsyncClient = app.state.daily_client
+    response = await client.post("/rooms", headers=headers, json=room_config)
+    result = orjson.loads(response.content)
+
+    # If room already exists, that's fine, get the room info
+    if response.status_code == 400 and "already exists" in str(result):
+        # Get the existing room
+        get_response = await client.get(f"/rooms/{request.room_name}", headers=headers)
+        if get_response.status_code == 200:
+            result = orjson.loads(get_response.content)
             room_url = result["url"]
-            background_tasks.add_task(start_main_py_background, room_url)
+            start_bot_background(room_url)
             result["background_task_started"] = True
-            result["message"] = "Room created and bot started"
-            result["expires_in_seconds"] = 300
-            result["expires_at"] = expiry_time
-            result["voice_id"] = DEFAULT_VOICE_ID
+            result["message"] = "Joined existing room and started bot"
+            result["voice_id"] = bot.resolve_voice_id()
             result["ai_name"] = DEFAULT_AI_NAME
             result["room_name"] = request.room_name
+            return result
 
-        return result
+    # If room creation was successful, start the background task
+    if response.status_code == 200 and "url" in result:
+        room_url = result["url"]
+        start_bot_background(room_url)
+        result["background_task_started"] = True
+        result["message"] = "Room created and bot started"
+        result["expires_in_seconds"] = 300
+        result["expires_at"] = expiry_time
+        result["voice_id"] = bot.resolve_voice_id()
+        result["ai_name"] = DEFAULT_AI_NAME
+        result["room_name"] = request.room_name
+
+    return result
 
 
 @app.delete("/delete-room/{room_name}")
@@ -212,27 +298,27 @@ async def delete_meeting_room(room_name: str):
     if not token:
         return {"error": "DAILY_API_KEY environment variable not set"}
 
-    url = f"https://api.daily.co/v1/rooms/{room_name}"
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
-    async with httpx.AsyncClient() as client:
-        response = await client.delete(url, headers=headers)
+    client: httpx.AsyncClient = app.state.daily_client
+    response = await client.delete(f"/rooms/{room_name}", headers=headers)
+    if response.status_code in (200, 404):
+        # The bot deletes its room when cancelled; let it skip the repeat call
+        bot.mark_room_deleted(room_name)
 
-        # Clean up any background processes for this room
-        room_url = (
-            f"https://{os.getenv('DAILY_DOMAIN', 'your-domain.daily.co')}/{room_name}"
-        )
-        await cleanup_background_process(room_url)
+    # Clean up any background processes for this room
+    room_url = f"https://{os.getenv('DAILY_DOMAIN', 'your-domain.daily.co')}/{room_name}"
+    await cleanup_background_process(room_url)
 
-        return response.json()
+    return orjson.loads(response.content)
 
 
 @app.get("/processes")
 async def list_background_processes():
     """List all active background processes"""
     processes_info = {}
-    for room_url, process in background_processes.items():
-        processes_info[room_url] = {"pid": process.pid, "alive": process.poll() is None}
+    for room_url, task in background_processes.items():
+        processes_info[room_url] = {"task": task.get_name(), "alive": not task.done()}
     return {"processes": processes_info}
 
 
@@ -1,168 +1,166 @@
 """Flow configuration for Pizza ordering bot conversation flow."""
 
-from pipecat_flows import FlowArgs, FlowConfig, FlowsFunctionSchema, FlowManager, NodeConfig
-
-
-def create_flow_config(ai_name: str) -> FlowConfig:
-    """
-    Create the conversation flow configuration for Pizza ordering bot.
-
-    Args:
-        ai_name: The name of the AI assistant (e.g., "Pizza ordering AI")
-
-    Returns:
-        FlowConfig dictionary with all conversation nodes
-    """
-
-    # Handler functions for the conversation flow
-    async def start_order(args: FlowArgs, flow_manager: FlowManager) -> tuple[None, str]:
-        """Start the pizza ordering process."""
-        return None, "choose_pizza_type"
-
-    async def select_size(args: FlowArgs, flow_manager: FlowManager) -> tuple[None, str]:
-        """Move to size selection."""
-        return None, "choose_size"
-
-    async def add_toppings(args: FlowArgs, flow_manager: FlowManager) -> tuple[None, str]:
-        """Move to toppings selection."""
-        return None, "choose_toppings"
-
-    async def skip_toppings(args: FlowArgs, flow_manager: FlowManager) -> tuple[None, str]:
-        """Skip toppings and go to confirmation."""
-        return None, "confirm_order"
-
-    async def confirm(args: FlowArgs, flow_manager: FlowManager) -> tuple[None, str]:
-        """Confirm the order."""
-        return None, "confirm_order"
-
-    async def complete(args: FlowArgs, flow_manager: FlowManager) -> tuple[None, str]:
-        """Complete the order."""
-        return None, "complete_order"
-
-    async def cancel_order(args: FlowArgs, flow_manager: FlowManager) -> tuple[None, str]:
-        """Cancel the order and start over."""
-        return None, "greet"
-
-    # Create function schemas
-    start_order_func = FlowsFunctionSchema(
-        name="start_order",
-        handler=start_order,
-        description="User wants to order a pizza.",
-        properties={},
-        required=[],
-    )
-
-    select_size_func = FlowsFunctionSchema(
-        name="select_size",
-        handler=select_size,
-        description="User has chosen a pizza type, move to size selection.",
-        properties={},
-        required=[],
-    )
-
-    add_toppings_func = FlowsFunctionSchema(
-        name="add_toppings",
-        handler=add_toppings,
-        description="User has chosen a size, ask about extra toppings.",
-        properties={},
-        required=[],
-    )
-
-    skip_toppings_func = FlowsFunctionSchema(
-        name="skip_toppings",
-        handler=skip_toppings,
-        description="User doesn't want extra toppings.",
-        properties={},
-        required=[],
-    )
-
-    confirm_func = FlowsFunctionSchema(
-        name="confirm",
-        handler=confirm,
-        description="User has chosen toppings, move to confirmation.",
-        properties={},
-        required=[],
-    )
-
-    complete_func = FlowsFunctionSchema(
-        name="complete",
-        handler=complete,
-        description="User confirms the order.",
-        properties={},
-        required=[],
-    )
-
-    cancel_order_func = FlowsFunctionSchema(
-        name="cancel_order",
-        handler=cancel_order,
-        description="User wants to cancel or start over.",
-        properties={},
-        required=[],
-    )
-
-    return {
-        "initial_node": "greet",
-        "nodes": {
-            "greet": {
-                "role_messages": [
-                    {
-                        "role": "system",
-                        "content": f"You are {ai_name}, a friendly pizza ordering assistant. Be warm, enthusiastic, and helpful. Keep responses concise and conversational.",
-                    }
-                ],
-                "task_messages": [
-                    {
-                        "role": "system",
-                        "content": f"Greet the user warmly and ask if they'd like to order a pizza. For example: 'Hi! Welcome to our pizzeria! I'm {ai_name}. Would you like to order a delicious pizza today?' Once they confirm they want to order, use the 'start_order' function.",
-                    }
-                ],
-                "functions": [start_order_func],
-            },
-            "choose_pizza_type": {
-                "task_messages": [
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any
+
+from pipecat_flows import FlowArgs, FlowsFunctionSchema, FlowManager, NodeConfig
+
+
+def _goto(node: str):
+    """Create a handler that moves the conversation to the given node."""
+
+    async def handler(args: FlowArgs, flow_manager: FlowManager) -> tuple[None, str]:
+        return None, node
+
+    return handler
+
+
+# Function name -> (node it moves to, description shown to the LLM)
+_TRANSITIONS = {
+    "start_order": ("choose_pizza_type", "User wants to order a pizza."),
+    "select_size": ("choose_size", "User has chosen a pizza type, move to size selection."),
+    "add_toppings": ("choose_toppings", "User has chosen a size, ask about extra toppings."),
+    "skip_toppings": ("confirm_order", "User doesn't want extra toppings."),
+    "confirm": ("confirm_order", "User has chosen toppings, move to confirmation."),
+    "complete": ("complete_order", "User confirms the order."),
+    "cancel_order": ("greet", "User wants to cancel or start over."),
+}
+
+_FUNCS = MappingProxyType(
+    {
+        name: FlowsFunctionSchema(
+            name=name,
+            handler=_goto(node),
+            description=description,
+            properties={},
+            required=[],
+        )
+        for name, (node, description) in _TRANSITIONS.items()
+    }
+)
+
+# Only the greet node mentions the AI's name; every other node is the same
+# for all configs and is built once here.
+#
+# Every bot in the server shares these objects, so nodes are mappingproxies
+# and message sequences are tuples. The message dicts stay dicts, since they
+# are serialized as JSON for the OpenAI request. FlowManager does not copy
+# them: each session's LLM context holds references to these same dicts, so
+# they are shared by every session and must be treated as immutable.
+# "functions" and "post_actions" stay lists: pipecat-flows' NodeConfig
+# declares them as lists and FlowManager's function and action handling is
+# written against that type. No code in this repo modifies any of them after
+# import.
+_GREET_ROLE_TEMPLATE = "You are {ai_name}, a friendly pizza ordering assistant. Be warm, enthusiastic, and helpful. Keep responses concise and conversational."
+_GREET_TASK_TEMPLATE = "Greet the user warmly and ask if they'd like to order a pizza. For example: 'Hi! Welcome to our pizzeria! I'm {ai_name}. Would you like to order a delicious pizza today?' Once they confirm they want to order, use the 'start_order' function."
+
+_STATIC_NODES = MappingProxyType(
+    {
+        "choose_pizza_type": MappingProxyType(
+            {
+                "task_messages": (
                     {
                         "role": "system",
                         "content": "Ask the user what type of pizza they'd like. Offer options: Margherita, Pepperoni, Vegetarian, Hawaiian, or Supreme. Keep it friendly and brief. Once they choose, use 'select_size'.",
-                    }
-                ],
-                "functions": [select_size_func],
-            },
-            "choose_size": {
-                "task_messages": [
+                    },
+                ),
+                "functions": [_FUNCS["select_size"]],
+            }
+        ),
+        "choose_size": MappingProxyType(
+            {
+                "task_messages": (
                     {
                         "role": "system",
                         "content": "Ask the user what size they'd like: Small (10 inch), Medium (12 inch), or Large (14 inch). Mention prices: Small $10, Medium $15, Large $20. Once they choose, use 'add_toppings'.",
-                    }
-                ],
-                "functions": [add_toppings_func],
-            },
-            "choose_toppings": {
-                "task_messages": [
+                    },
+                ),
+                "functions": [_FUNCS["add_toppings"]],
+            }
+        ),
+        "choose_toppings": MappingProxyType(
+            {
+                "task_messages": (
                     {
                         "role": "system",
                         "content": "Ask if they want any extra toppings. Offer: extra cheese, mushrooms, olives, bell peppers, onions, bacon, or sausage ($2 each). They can choose multiple or none. Use 'confirm' when done or 'skip_toppings' if they don't want any.",
-                    }
-                ],
-                "functions": [skip_toppings_func, confirm_func],
-            },
-            "confirm_order": {
-                "task_messages": [
+                    },
+                ),
+                "functions": [_FUNCS["skip_toppings"], _FUNCS["confirm"]],
+            }
+        ),
+        "confirm_order": MappingProxyType(
+            {
+                "task_messages": (
                     {
                         "role": "system",
                         "content": "Summarize their order clearly (pizza type, size, toppings if any, and total price). Ask them to confirm. Use 'complete' if they confirm, or 'cancel_order' if they want to start over.",
-                    }
-                ],
-                "functions": [complete_func, cancel_order_func],
-            },
-            "complete_order": {
-                "task_messages": [
+                    },
+                ),
+                "functions": [_FUNCS["complete"], _FUNCS["cancel_order"]],
+            }
+        ),
+        "complete_order": MappingProxyType(
+            {
+                "task_messages": (
                     {
                         "role": "system",
                         "content": "Thank the user and give them a random order number. Tell them their pizza will be ready in 20-30 minutes. Be friendly and warm, then end the conversation.",
-                    }
-                ],
+                    },
+                ),
                 "functions": [],
                 "post_actions": [{"type": "end_conversation"}],
-            },
-        },
+            }
+        ),
     }
+)
+
+
+@lru_cache(maxsize=8)
+def create_flow_config(ai_name: str, role_prompt: str | None = None) -> Mapping[str, Any]:
+    """
+    Create the conversation flow configuration for Pizza ordering bot.
+
+    The config only depends on its arguments, so it is built once per
+    combination and the same read-only mapping is returned to every session.
+    Only the greet node is built per call; the other nodes are shared
+    module-level constants.
+
+    Args:
+        ai_name: The name of the AI assistant (e.g., "Pizza ordering AI")
+        role_prompt: System prompt to use instead of the default greet role
+            message built from ai_name
+
+    Returns:
+        Read-only mapping with the FlowConfig layout: the config, its nodes
+        and each node are mappingproxies and the message sequences are
+        tuples. Callers that need to customise a node should build a new
+        mapping instead of mutating the returned one.
+    """
+    greet = MappingProxyType(
+        {
+            "role_messages": (
+                {
+                    "role": "system",
+                    "content": role_prompt
+                    or _GREET_ROLE_TEMPLATE.format(ai_name=ai_name),
+                },
+            ),
+            "task_messages": (
+                {
+                    "role": "system",
+                    "content": _GREET_TASK_TEMPLATE.format(ai_name=ai_name),
+                },
+            ),
+            "functions": [_FUNCS["start_order"]],
+        }
+    )
+
+    return MappingProxyType(
+        {
+            "initial_node": "greet",
+            "nodes": MappingProxyType({"greet": greet, **_STATIC_NODES}),
+        }
+    )
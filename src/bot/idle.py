@@ -0,0 +1,62 @@
+"""User idle processor whose timeout follows how long the user takes to reply."""
+
+import time
+
+from pipecat.frames.frames import (
+    BotStartedSpeakingFrame,
+    BotStoppedSpeakingFrame,
+    Frame,
+    UserStartedSpeakingFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection
+from pipecat.processors.user_idle_processor import UserIdleProcessor
+
+
+class AdaptiveUserIdleProcessor(UserIdleProcessor):
+    """
+    UserIdleProcessor that adapts its timeout to the user's reply time.
+
+    The reply time is measured from the bot finishing speaking to the user
+    starting to speak. The timeout is kept at twice its moving average,
+    clamped to [min_timeout, max_timeout], so a user who pauses to think
+    isn't prompted too early and a quick user isn't left in silence.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float,
+        min_timeout: float = 3.0,
+        max_timeout: float = 12.0,
+        smoothing: float = 0.3,
+        **kwargs,
+    ):
+        super().__init__(timeout=timeout, **kwargs)
+        self._min_timeout = min_timeout
+        self._max_timeout = max_timeout
+        self._smoothing = smoothing
+        self._reply_time: float | None = None
+        self._bot_stopped_at: float | None = None
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        if isinstance(frame, BotStoppedSpeakingFrame):
+            self._bot_stopped_at = time.monotonic()
+        elif isinstance(frame, BotStartedSpeakingFrame):
+            self._bot_stopped_at = None
+        elif (
+            isinstance(frame, UserStartedSpeakingFrame)
+            and self._bot_stopped_at is not None
+        ):
+            self._update_timeout(time.monotonic() - self._bot_stopped_at)
+            self._bot_stopped_at = None
+
+        await super().process_frame(frame, direction)
+
+    def _update_timeout(self, reply_time: float):
+        """Fold one reply time into the average and derive the new timeout"""
+        if self._reply_time is None:
+            self._reply_time = reply_time
+        else:
+            self._reply_time += self._smoothing * (reply_time - self._reply_time)
+        # UserIdleProcessor reads _timeout each time it starts waiting
+        self._timeout = min(max(2 * self._reply_time, self._min_timeout), self._max_timeout)
@@ -3,42 +3,144 @@ import os
 import sys
 import signal
 import argparse
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Final
 
 import aiohttp
-import httpx
 from dotenv import load_dotenv
 from loguru import logger
-from pipecat.audio.vad.silero import SileroVADAnalyzer
-from pipecat.audio.vad.vad_analyzer import VADParams
-from pipecat.pipeline.pipeline import Pipeline
-from pipecat.pipeline.runner import PipelineRunner
-from pipecat.pipeline.task import PipelineParams, PipelineTask
-from pipecat.processors.aggregators.llm_context import LLMContext
-from pipecat.processors.aggregators.llm_response_universal import LLMContextAggregatorPair
-from pipecat.processors.user_idle_processor import UserIdleProcessor
-from pipecat.frames.frames import EndFrame, TTSSpeakFrame
-from pipecat.services.cartesia.tts import CartesiaTTSService
-from pipecat.services.deepgram.stt import DeepgramSTTService
-from pipecat.services.openai.llm import OpenAILLMService
-from pipecat.transports.daily.transport import DailyParams, DailyTransport
 
-from pipecat_flows import FlowConfig, FlowManager
+# pipecat and pipecat_flows are imported where they are used: they pull in
+# onnxruntime and the service SDKs, which would otherwise be paid before
+# argparse has even had a chance to handle --help or a missing --url.
 
-from flow_config import create_flow_config
+# Shared session for Daily REST calls, created on first use
+_http_session: aiohttp.ClientSession | None = None
+_http_session_lock = asyncio.Lock()
 
-load_dotenv(override=True)
-
-logger.remove(0)
-logger.add(sys.stderr, level="DEBUG")
-
-# Global variables to store room URL and process info
-room_url: str | None = None
-current_process_pid: int | None = None
+# In-flight delete per room name, and when each room was last deleted
+_delete_inflight: dict[str, asyncio.Task] = {}
+_recently_deleted: dict[str, float] = {}
 
 # Default values
-DEFAULT_AI_NAME = "Pizza ordering AI"
+DEFAULT_AI_NAME: Final = "Pizza ordering AI"
 # Cartesia voice - British Reading Lady
-DEFAULT_VOICE_ID = "820a3788-2b37-4d21-847a-b65d8a68c99a"
+DEFAULT_VOICE_ID: Final = "820a3788-2b37-4d21-847a-b65d8a68c99a"
+DEFAULT_LLM_MODEL: Final = "gpt-4o"
+# System prompt used in place of the greet node's default role message
+SYSTEM_PROMPT: Final = "You are a friendly and helpful pizza ordering assistant. Guide customers through ordering delicious pizzas with a warm, conversational tone."
+# Every session shares the same system and task prompts, so a stable cache
+# key lets OpenAI route requests to servers that already hold that prefix
+PROMPT_CACHE_KEY: Final = "pizza-ordering-v1"
+# Room deletion runs during shutdown, so bound how long it may take: each
+# attempt gets DELETE_ROOM_TIMEOUT seconds and is retried once
+DELETE_ROOM_TIMEOUT: Final = 3.0
+DELETE_ROOM_ATTEMPTS: Final = 2
+# Keys every bot needs; both entrypoints refuse to start without them
+REQUIRED_ENV: Final = ("DAILY_API_KEY", "DEEPGRAM_API_KEY", "CARTESIA_API_KEY", "OPENAI_API_KEY")
+# How long a deleted room is remembered so repeat deletes skip the API call
+DELETED_ROOM_TTL: Final = 60.0
+# What the bot says after each successive idle timeout
+IDLE_PROMPTS: Final = (
+    "Are you still there? I'm here to help you order a pizza!",
+    "Hello? Would you still like to order a pizza?",
+    "It seems like you're busy right now. Feel free to come back when you're ready to order. Have a great day!",
+)
+
+
+async def _get_http_session() -> aiohttp.ClientSession:
+    """Return the shared HTTP session, creating it on first use"""
+    global _http_session
+    async with _http_session_lock:
+        if _http_session is None:
+            _http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=100, limit_per_host=20, keepalive_timeout=60, ttl_dns_cache=300
+                ),
+                # No total cap: each call bounds its own attempt (delete_room()
+                # uses DELETE_ROOM_TIMEOUT). The short connect timeout keeps
+                # DNS/TCP from eating that whole budget.
+                timeout=aiohttp.ClientTimeout(total=None, connect=1.0),
+            )
+        return _http_session
+
+
+async def close_http_session():
+    """Close the shared HTTP session if it was created"""
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+
+async def _send_delete(
+    session: aiohttp.ClientSession, url: str, headers: MappingProxyType
+) -> tuple[int, str]:
+    """Issue a DELETE and return its status code and body"""
+    async with session.delete(url, headers=headers) as response:
+        return response.status, await response.text()
+
+
+def mark_room_deleted(room_name: str):
+    """Remember that a room is gone so delete_room() won't call Daily for it"""
+    now = time.monotonic()
+    # Drop expired entries so the map stays bounded by recent deletions
+    for name, deleted_at in list(_recently_deleted.items()):
+        if now - deleted_at > DELETED_ROOM_TTL:
+            del _recently_deleted[name]
+    _recently_deleted[room_name] = now
+
+
+def forget_room_deleted(room_name: str):
+    """Drop a room's deletion record, e.g. because a room by that name was recreated"""
+    _recently_deleted.pop(room_name, None)
+
+
+def _was_deleted(room_name: str) -> bool:
+    """Check whether a room was deleted within the last DELETED_ROOM_TTL seconds"""
+    deleted_at = _recently_deleted.get(room_name)
+    return deleted_at is not None and time.monotonic() - deleted_at <= DELETED_ROOM_TTL
+
+
+@lru_cache(maxsize=1)
+def _daily_headers(token: str) -> MappingProxyType:
+    """Build the Daily API headers once per token"""
+    return MappingProxyType(
+        {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+    )
+
+
+async def _delete_room_now(room_name: str, token: str):
+    """Send the DELETE for a room to Daily, retrying within the time budget"""
+    url = f"https://api.daily.co/v1/rooms/{room_name}"
+    headers = _daily_headers(token)
+
+    session = await _get_http_session()
+    for attempt in range(1, DELETE_ROOM_ATTEMPTS + 1):
+        try:
+            status, body = await asyncio.wait_for(
+                _send_delete(session, url, headers), timeout=DELETE_ROOM_TIMEOUT
+            )
+            break
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logger.warning(f"Attempt {attempt} to delete room {room_name} failed: {e!r}")
+    else:
+        logger.error(f"Giving up on deleting room {room_name}")
+        return
+
+    if status == 200:
+        mark_room_deleted(room_name)
+        logger.info(f"Successfully deleted room: {room_name}")
+    elif status == 404:
+        mark_room_deleted(room_name)
+        logger.info(f"Room {room_name} was already deleted")
+    else:
+        logger.error(f"Failed to delete room {room_name}: {status} - {body}")
 
 
 async def delete_room(room_url: str | None):
@@ -53,208 +155,340 @@ async def delete_room(room_url: str | None):
             logger.error("DAILY_API_KEY environment variable not set")
             return
 
-        room_name = room_url.split("/")[-1]
-        url = f"https://api.daily.co/v1/rooms/{room_name}"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
+        room_name = room_url.rpartition("/")[2]
+        if _was_deleted(room_name):
+            logger.debug(f"Room {room_name} already deleted, skipping")
+            return
+
+        # participant-left, cancellation and the server's endpoint can all
+        # ask for the same room at once; they share one in-flight request
+        task = _delete_inflight.get(room_name)
+        if task is None:
+            task = asyncio.create_task(_delete_room_now(room_name, token))
+            _delete_inflight[room_name] = task
+            task.add_done_callback(lambda _: _delete_inflight.pop(room_name, None))
 
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(url, headers=headers)
-            if response.status_code == 200:
-                logger.info(f"Successfully deleted room: {room_name}")
-            else:
-                logger.error(
-                    f"Failed to delete room {room_name}: {response.status_code} - {response.text}"
-                )
+        # Shielded so one caller being cancelled doesn't abort the others' delete
+        await asyncio.shield(task)
     except Exception as e:
         logger.error(f"Error deleting room: {e}")
 
 
-def kill_current_process():
-    """Kill the current process"""
+def require_env(*names: str):
+    """Exit before any service is built if a required variable is unset"""
+    missing = [name for name in names if not os.environ.get(name)]
+    if missing:
+        raise SystemExit(f"Missing required environment variables: {', '.join(missing)}")
+
+
+def build_services(room_url: str, bot_name: str, voice_id: str):
+    """Create the Daily transport and the STT, TTS and LLM services for a room"""
+    from pipecat.audio.vad.vad_analyzer import VADParams
+    from pipecat.services.cartesia.tts import CartesiaTTSService
+    from pipecat.services.deepgram.stt import DeepgramSTTService
+    from pipecat.services.openai.llm import OpenAILLMService
+    from pipecat.transports.daily.transport import DailyParams, DailyTransport
+
+    from src.bot.vad import SharedSileroVADAnalyzer
+
+    logger.info("🎙️ Initializing DailyTransport...")
+    transport = DailyTransport(
+        room_url,
+        None,
+        bot_name,
+        DailyParams(
+            audio_in_enabled=True,
+            audio_out_enabled=True,
+            vad_analyzer=SharedSileroVADAnalyzer(params=VADParams(stop_secs=0.2)),
+        ),
+    )
+    logger.info(f"✅ DailyTransport initialized for room: {room_url}")
+
+    logger.info("🎤 Initializing STT service (Deepgram)...")
+    stt = DeepgramSTTService(api_key=os.environ["DEEPGRAM_API_KEY"])
+    logger.info("✅ STT service initialized")
+
+    logger.info(f"🔊 Initializing TTS service (Cartesia) with voice_id: {voice_id}...")
+    tts = CartesiaTTSService(
+        api_key=os.environ["CARTESIA_API_KEY"],
+        voice_id=voice_id,
+    )
+    logger.info("✅ TTS service initialized")
+
+    # Idle prompts are spoken without the LLM, so every LLM turn is a real
+    # order turn; OPENAI_MODEL lets a deployment trade quality for latency
+    model = os.getenv("OPENAI_MODEL") or DEFAULT_LLM_MODEL
+    logger.info(f"🤖 Initializing LLM service (OpenAI {model})...")
+    llm = OpenAILLMService(
+        api_key=os.environ["OPENAI_API_KEY"],
+        model=model,
+        params=OpenAILLMService.InputParams(
+            extra={"extra_body": {"prompt_cache_key": PROMPT_CACHE_KEY}}
+        ),
+    )
+    logger.info("✅ LLM service initialized")
+
+    return transport, stt, tts, llm
+
+
+async def warm_up_llm(llm):
+    """Open the LLM client's connection before the first turn needs it"""
+    # Deepgram and Cartesia open their websockets when the pipeline starts,
+    # but the OpenAI client connects lazily on the first completion. A model
+    # lookup is free and leaves a pooled TLS connection for that first turn.
+    # The client is a private attribute of the service, so skip the warm-up
+    # rather than fail if a pipecat release renames it.
+    client = getattr(llm, "_client", None)
+    if client is None:
+        logger.debug("LLM service has no _client, skipping warm-up")
+        return
     try:
-        logger.info(f"Terminating process with PID: {os.getpid()}")
-        os.kill(os.getpid(), signal.SIGTERM)
+        await client.models.retrieve(llm.model_name)
+        logger.debug("LLM connection warmed up")
     except Exception as e:
-        logger.error(f"Error killing process: {e}")
-        sys.exit(0)
+        logger.warning(f"LLM warm-up failed: {e}")
 
 
-def signal_handler(signum, frame):
-    """Handle termination signals gracefully"""
-    logger.info(f"Received signal {signum}, cleaning up...")
-    if room_url:
-        asyncio.create_task(delete_room(room_url))
-    sys.exit(0)
+def build_pipeline(services):
+    """Wire the services into a pipeline and return it with its context aggregator"""
+    from pipecat.frames.frames import EndTaskFrame, TTSSpeakFrame
+    from pipecat.pipeline.pipeline import Pipeline
+    from pipecat.processors.aggregators.llm_context import LLMContext
+    from pipecat.processors.aggregators.llm_response_universal import (
+        LLMContextAggregatorPair,
+    )
+    from pipecat.processors.frame_processor import FrameDirection
+    from pipecat.processors.user_idle_processor import UserIdleProcessor
+
+    from src.bot.idle import AdaptiveUserIdleProcessor
+
+    transport, stt, tts, llm = services
+
+    context = LLMContext()
+    context_aggregator = LLMContextAggregatorPair(context)
+
+    async def handle_user_idle(user_idle: UserIdleProcessor, retry_count: int) -> bool:
+        # Frames carry per-instance ids and pipeline state, so a new one is
+        # pushed each time; only the text is shared
+        if retry_count < len(IDLE_PROMPTS):
+            # First two attempts: prompt the user to keep going
+            await user_idle.push_frame(TTSSpeakFrame(IDLE_PROMPTS[retry_count - 1]))
+            return True
+        # Last attempt: say goodbye, then ask the pipeline task to end once
+        # it has been spoken
+        await user_idle.push_frame(TTSSpeakFrame(IDLE_PROMPTS[-1]))
+        await user_idle.push_frame(EndTaskFrame(), FrameDirection.UPSTREAM)
+        return False
+
+    # Starts at 5 seconds, then follows how long this user takes to reply
+    user_idle = AdaptiveUserIdleProcessor(callback=handle_user_idle, timeout=5.0)
+
+    pipeline = Pipeline(
+        [
+            transport.input(),
+            stt,
+            user_idle,
+            context_aggregator.user(),
+            llm,
+            tts,
+            transport.output(),
+            context_aggregator.assistant(),
+        ]
+    )
 
+    return pipeline, context_aggregator
 
-signal.signal(signal.SIGTERM, signal_handler)
-signal.signal(signal.SIGINT, signal_handler)
 
+async def run_session(room_url: str, services, pipeline, context_aggregator, flow_config):
+    """Run one conversation until the participant leaves or the bot is cancelled"""
+    from pipecat.pipeline.runner import PipelineRunner
+    from pipecat.pipeline.task import PipelineParams, PipelineTask
+    from pipecat_flows import FlowManager
 
-async def fetch_dynamic_prompt() -> str:
-    """Get the default system prompt for the pizza ordering bot"""
-    return "You are a friendly and helpful pizza ordering assistant. Guide customers through ordering delicious pizzas with a warm, conversational tone."
+    transport, stt, tts, llm = services
 
+    task = PipelineTask(pipeline, params=PipelineParams(allow_interruptions=True))
 
-async def main():
-    """Main function to set up and run the Pizza ordering bot."""
-    global room_url
+    flow_manager = FlowManager(
+        task=task,
+        llm=llm,
+        context_aggregator=context_aggregator,
+        flow_config=flow_config,
+        transport=transport,
+    )
+
+    @transport.event_handler("on_first_participant_joined")
+    async def on_first_participant_joined(transport, participant):
+        # Independent of each other, so the Daily call and the flow's first
+        # LLM turn start together. initialize() still waits for the join:
+        # it makes the bot greet, which nobody would hear any earlier.
+        await asyncio.gather(
+            transport.capture_participant_transcription(participant["id"]),
+            flow_manager.initialize(),
+        )
 
-    # Parse command line arguments
+    @transport.event_handler("on_app_message")
+    async def on_app_message(transport, message, sender):
+        # App messages can be frequent and large; loguru only formats them
+        # when DEBUG is enabled
+        logger.debug("📨 APP MESSAGE from {}: {}", sender, message)
+
+    @transport.event_handler("on_call_state_updated")
+    async def on_call_state_updated(transport, state):
+        logger.info(f"📞 CALL STATE UPDATED: {state}")
+
+    @transport.event_handler("on_participant_joined")
+    async def on_participant_joined(transport, participant):
+        logger.info(f"👥 PARTICIPANT JOINED (any): {participant['id']}")
+
+    @transport.event_handler("on_participant_left")
+    async def on_participant_left(transport, participant, *args):
+        logger.info(f"🔴 PARTICIPANT LEFT: {participant['id']}")
+        logger.info("🗑️ Deleting room and stopping the pipeline...")
+        # Cancelling the task makes runner.run() return, so run_bot() exits
+        # normally instead of the process signalling itself. The Daily
+        # round-trip overlaps the pipeline shutdown instead of preceding it;
+        # delete_room() shields its request, so teardown can't cut it short.
+        await asyncio.gather(delete_room(room_url), task.cancel())
+
+    logger.info("🚀 Starting pipeline runner...")
+    # Whoever runs the bot owns the signals: main() in a standalone process,
+    # uvicorn inside the server. They stop the bot by cancelling run_bot().
+    runner = PipelineRunner(handle_sigint=False)
+    # Runs while the bot joins the room and waits for the participant
+    warm_up_task = asyncio.create_task(warm_up_llm(llm))
+    runner_task = asyncio.create_task(runner.run(task))
+    try:
+        # Shielded so a cancellation from outside can still shut the
+        # pipeline down in order rather than tearing through it
+        await asyncio.shield(runner_task)
+    except asyncio.CancelledError:
+        logger.info("Bot cancelled, cleaning up...")
+        try:
+            await delete_room(room_url)
+        finally:
+            # A second cancellation (e.g. the server giving up waiting) must
+            # not leave the shielded runner behind: stop it in order if we
+            # can, otherwise cancel it outright
+            try:
+                await task.cancel()
+                await runner_task
+            except asyncio.CancelledError:
+                runner_task.cancel()
+                raise
+        raise
+    finally:
+        warm_up_task.cancel()
+    logger.info("Pipeline runner completed")
+
+
+def preload():
+    """Import the pipeline's dependencies ahead of the first session"""
+    # Called by the server at startup so the first room doesn't pay for
+    # loading pipecat, the service SDKs, onnxruntime or the VAD model
+    import pipecat.pipeline.runner  # noqa: F401
+    import pipecat.services.cartesia.tts  # noqa: F401
+    import pipecat.services.deepgram.stt  # noqa: F401
+    import pipecat.services.openai.llm  # noqa: F401
+    import pipecat.transports.daily.transport  # noqa: F401
+    import pipecat_flows  # noqa: F401
+
+    import src.bot.flow_config  # noqa: F401
+    from src.bot.vad import warm_up_silero_session
+
+    # Every room's analyzer runs on this one session; loading it and running
+    # it once here takes the model load off the first room's audio path
+    warm_up_silero_session()
+
+
+def resolve_voice_id() -> str:
+    """Return the Cartesia voice from the environment, or the default voice"""
+    return os.getenv("CARTESIA_VOICE_ID") or DEFAULT_VOICE_ID
+
+
+async def run_bot(
+    room_url: str,
+    flow_config,
+    *,
+    bot_name: str = DEFAULT_AI_NAME,
+    voice_id: str | None = None,
+):
+    """Join a Daily room as bot_name and run one conversation through flow_config"""
+    voice_id = voice_id or resolve_voice_id()
+    logger.info(f"Using AI name: {bot_name} with voice ID: {voice_id}")
+
+    services = build_services(room_url, bot_name, voice_id)
+    pipeline, context_aggregator = build_pipeline(services)
+    await run_session(room_url, services, pipeline, context_aggregator, flow_config)
+
+
+def configure():
+    """Load .env and set up logging for the standalone bot"""
+    # Only the bot's own entrypoint does this: the server imports this module
+    # and keeps its environment and log sinks to itself
+    load_dotenv(override=True)
+
+    # DEBUG makes pipecat format a record for every audio/VAD frame, so it is
+    # opt-in. enqueue=True moves the stderr writes off the event loop thread,
+    # and backtrace/diagnose are off so errors don't walk and dump every stack
+    # frame.
+    log_level = os.getenv("LOG_LEVEL", "INFO")
+    logger.remove(0)
+    logger.add(sys.stderr, level=log_level, enqueue=True, backtrace=False, diagnose=False)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line of the standalone bot"""
     parser = argparse.ArgumentParser(description="Pizza Ordering Bot")
     parser.add_argument(
         "-u", "--url", type=str, required=True, help="URL of the Daily room to join"
     )
+    return parser.parse_args()
 
-    args = parser.parse_args()
 
-    # Get voice ID from environment or use default
-    voice_id = os.getenv("CARTESIA_VOICE_ID") or DEFAULT_VOICE_ID
-    ai_name = DEFAULT_AI_NAME
-    logger.info(f"Using AI name: {ai_name} with voice ID: {voice_id}")
-
-    # Create dynamic flow configuration with the appropriate AI name
-    dynamic_flow_config: FlowConfig = create_flow_config(ai_name)
-
-    # Fetch dynamic prompt and inject it into the flow configuration
-    try:
-        dynamic_prompt = await fetch_dynamic_prompt()
-        dynamic_flow_config["nodes"]["greet"]["role_messages"] = [
-            {
-                "role": "system",
-                "content": dynamic_prompt,
-            }
-        ]
-        logger.info(f"System prompt: {dynamic_prompt}")
-        logger.info("Injected system prompt into flow_config.")
-    except Exception as e:
-        logger.warning(f"Failed to inject system prompt: {e}")
-
-    async with aiohttp.ClientSession() as session:
-        # Use the provided room URL instead of calling configure
-        room_url = args.url
-
-        if not room_url:
-            logger.error("No room URL provided")
-            return
-
-        logger.info("🎙️ Initializing DailyTransport...")
-        transport = DailyTransport(
-            room_url,
-            None,
-            DEFAULT_AI_NAME,
-            DailyParams(
-                audio_in_enabled=True,
-                audio_out_enabled=True,
-                vad_analyzer=SileroVADAnalyzer(params=VADParams(stop_secs=0.2)),
-            ),
-        )
-        logger.info(f"✅ DailyTransport initialized for room: {room_url}")
-
-        logger.info("🎤 Initializing STT service (Deepgram)...")
-        stt = DeepgramSTTService(api_key=os.getenv("DEEPGRAM_API_KEY") or "")
-        logger.info("✅ STT service initialized")
-
-        logger.info(f"🔊 Initializing TTS service (Cartesia) with voice_id: {voice_id}...")
-        tts = CartesiaTTSService(
-            api_key=os.getenv("CARTESIA_API_KEY") or "",
-            voice_id=voice_id,
-        )
-        logger.info("✅ TTS service initialized")
-
-        logger.info("🤖 Initializing LLM service (OpenAI GPT-4o)...")
-        llm = OpenAILLMService(
-            api_key=os.getenv("OPENAI_API_KEY") or "", model="gpt-4o"
-        )
-        logger.info("✅ LLM service initialized")
-
-        context = LLMContext()
-        context_aggregator = LLMContextAggregatorPair(context)
-
-        async def handle_user_idle(
-            user_idle: UserIdleProcessor, retry_count: int
-        ) -> bool:
-            if retry_count == 1:
-                # First attempt: Add a gentle prompt to the conversation
-                await user_idle.push_frame(
-                    TTSSpeakFrame(
-                        "Are you still there? I'm here to help you order a pizza!"
-                    )
-                )
-                return True
-            elif retry_count == 2:
-                # Second attempt: More direct prompt
-                await user_idle.push_frame(
-                    TTSSpeakFrame("Hello? Would you still like to order a pizza?")
-                )
-                return True
-            else:
-                # Third attempt: End the conversation
-                await user_idle.push_frame(
-                    TTSSpeakFrame(
-                        "It seems like you're busy right now. Feel free to come back when you're ready to order. Have a great day!"
-                    )
-                )
-                await task.queue_frame(EndFrame())
-                return False
-
-        user_idle = UserIdleProcessor(callback=handle_user_idle, timeout=5.0)
-
-        pipeline = Pipeline(
-            [
-                transport.input(),
-                stt,
-                user_idle,
-                context_aggregator.user(),
-                llm,
-                tts,
-                transport.output(),
-                context_aggregator.assistant(),
-            ]
-        )
-
-        task = PipelineTask(pipeline, params=PipelineParams(allow_interruptions=True))
-
-        flow_manager = FlowManager(
-            task=task,
-            llm=llm,
-            context_aggregator=context_aggregator,
-            flow_config=dynamic_flow_config,
-            transport=transport,
-        )
-
-        @transport.event_handler("on_first_participant_joined")
-        async def on_first_participant_joined(transport, participant):
-            await transport.capture_participant_transcription(participant["id"])
-            await flow_manager.initialize()
+async def main(room_url: str):
+    """Main function to set up and run the Pizza ordering bot."""
+    from src.bot.flow_config import create_flow_config
 
-        @transport.event_handler("on_app_message")
-        async def on_app_message(transport, message, sender):
-            logger.info(f"📨 APP MESSAGE from {sender}: {message}")
+    # Flow configuration with the default AI name and system prompt
+    flow_config = create_flow_config(DEFAULT_AI_NAME, SYSTEM_PROMPT)
+    logger.info(f"System prompt: {SYSTEM_PROMPT}")
 
-        @transport.event_handler("on_call_state_updated")
-        async def on_call_state_updated(transport, state):
-            logger.info(f"📞 CALL STATE UPDATED: {state}")
+    bot_task = asyncio.create_task(
+        run_bot(room_url, flow_config, bot_name=DEFAULT_AI_NAME)
+    )
 
-        @transport.event_handler("on_participant_joined")
-        async def on_participant_joined(transport, participant):
-            logger.info(f"👥 PARTICIPANT JOINED (any): {participant['id']}")
+    def on_signal(sig: signal.Signals):
+        logger.info(f"Received signal {sig.name}, cleaning up...")
+        bot_task.cancel()
 
-        @transport.event_handler("on_participant_left")
-        async def on_participant_left(transport, participant, *args):
-            logger.info(f"🔴 PARTICIPANT LEFT: {participant['id']}")
-            logger.info("🗑️ Deleting room and terminating process...")
-            await delete_room(room_url)
-            kill_current_process()
+    # Handlers run inside the event loop, so the bot is cancelled on the
+    # loop that is actually running the pipeline.
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, on_signal, sig)
 
-        logger.info("🚀 Starting pipeline runner...")
-        runner = PipelineRunner()
-        await runner.run(task)
-        logger.info("Pipeline runner completed")
+    try:
+        await bot_task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await close_http_session()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Bad arguments and missing keys fail here, before an event loop exists.
+    # A missing key would otherwise only surface as an auth failure deep
+    # inside the first network call.
+    args = parse_args()
+    configure()
+    require_env(*REQUIRED_ENV)
+
+    # uvloop's libuv-based loop is cheaper per callback for the many sockets
+    # the pipeline keeps open; fall back to asyncio where it isn't available.
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main(args.url))
+    else:
+        uvloop.run(main(args.url))
@@ -0,0 +1,73 @@
+"""Silero VAD analyzer that shares one ONNX session across bot sessions."""
+
+from functools import lru_cache
+from importlib import resources
+
+import numpy as np
+import onnxruntime
+from pipecat.audio.vad.silero import SileroOnnxModel, SileroVADAnalyzer
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams
+
+
+@lru_cache(maxsize=1)
+def load_silero_session() -> onnxruntime.InferenceSession:
+    """
+    Load the Silero VAD model bundled with pipecat, once per process.
+
+    Returns:
+        ONNX Runtime session restricted to one CPU thread, since a single
+        16 kHz frame is too small to benefit from more and extra threads
+        would only contend with the audio pipeline.
+    """
+    model_path = resources.files("pipecat.audio.vad.data").joinpath("silero_vad.onnx")
+
+    opts = onnxruntime.SessionOptions()
+    opts.inter_op_num_threads = 1
+    opts.intra_op_num_threads = 1
+
+    return onnxruntime.InferenceSession(
+        str(model_path), providers=["CPUExecutionProvider"], sess_options=opts
+    )
+
+
+class _SharedSessionModel(SileroOnnxModel):
+    """Silero model with its own recurrent state, running on a borrowed session."""
+
+    def __init__(self, session: onnxruntime.InferenceSession):
+        self.session = session
+        self.sample_rates = [8000, 16000]
+        self.reset_states()
+
+
+def warm_up_silero_session(session: onnxruntime.InferenceSession | None = None):
+    """
+    Run one inference on silence on the shared session.
+
+    ONNX Runtime allocates its buffers on a session's first run; doing that
+    here keeps the cost off the first audio frame of the first room.
+    """
+    model = _SharedSessionModel(session or load_silero_session())
+    # 512 samples is one Silero window at 16 kHz
+    model(np.zeros(512, dtype=np.float32), 16000)
+
+
+class SharedSileroVADAnalyzer(SileroVADAnalyzer):
+    """
+    SileroVADAnalyzer that runs on a shared ONNX session.
+
+    The per-stream state (model context, smoothing, speaking state) stays on
+    each analyzer, so every session still needs its own instance; only the
+    loaded model and its ONNX Runtime session are shared.
+    """
+
+    def __init__(
+        self,
+        *,
+        sample_rate: int | None = None,
+        params: VADParams | None = None,
+        session: onnxruntime.InferenceSession | None = None,
+    ):
+        # Skip SileroVADAnalyzer.__init__, which would load the model again
+        VADAnalyzer.__init__(self, sample_rate=sample_rate, params=params)
+        self._model = _SharedSessionModel(session or load_silero_session())
+        self._last_reset_time = 0